@@ -1,12 +1,21 @@
 """Code for day 6."""
 
+from __future__ import annotations
+
 import copy
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from enum import StrEnum, auto
+from itertools import pairwise
 
 Coordinate = namedtuple("Coordinate", ["x", "y"])
 
+# Read-only map shared with the obstruction search worker processes.
+_SHARED_MAP: list[list[str]] = []
+# Each worker's visited states, allocated once and reset between trials.
+_SHARED_VISITED: VisitedStates | None = None
+
 
 class Direction(StrEnum):
     """Directions the guard can face."""
@@ -44,6 +53,46 @@ class Guard:
             self.direction = Direction.UP
 
 
+DIRECTION_INDEX: dict[Direction, int] = {
+    direction: i for i, direction in enumerate(Direction)
+}
+
+
+@dataclass
+class VisitedStates:
+    """Bitset of guard states, one bit per cell and direction."""
+
+    width: int
+    height: int
+    bits: bytearray = field(init=False)
+    touched: list[int] = field(default_factory=list, init=False)
+
+    def __post_init__(self):
+        self.bits = bytearray((self.width * self.height * 4 + 7) // 8)
+
+    @classmethod
+    def for_map(cls, the_map: list[list[str]]) -> VisitedStates:
+        """Make a bitset big enough for every state on the map."""
+        return cls(width=len(the_map[0]), height=len(the_map))
+
+    def test_and_set(self, x: int, y: int, direction: Direction) -> bool:
+        """Mark the state visited, returning if it already was."""
+        index = (y * self.width + x) * 4 + DIRECTION_INDEX[direction]
+        byte, bit = index >> 3, 1 << (index & 7)
+        if self.bits[byte] & bit:
+            return True
+        if not self.bits[byte]:
+            self.touched.append(byte)
+        self.bits[byte] |= bit
+        return False
+
+    def reset(self):
+        """Clear only the bytes the last trial wrote to."""
+        for byte in self.touched:
+            self.bits[byte] = 0
+        self.touched.clear()
+
+
 def get_input(filename: str) -> list[list[str]]:
     """Read the file and yield rules."""
     ret_value: list[list[str]] = []
@@ -278,6 +327,7 @@ def brute_force(
     loops_found = 0
     init_guard = find_guard(the_map)
     tested_coords = []
+    visited = VisitedStates.for_map(the_map)
     for position in guard.positions:
         next_coordinate = position[0]
         # Get one position ahead to place an obstacle.
@@ -307,7 +357,7 @@ def brute_force(
             new_map = copy.deepcopy(the_map)
             new_map[next_coordinate.y][next_coordinate.x] = "#"
             new_guard = find_guard(new_map)
-            run_guard(new_guard, new_map)
+            run_guard(new_guard, new_map, visited)
             tested_coords.append(next_coordinate)
             if new_guard.loops_found:
                 loops_found += new_guard.loops_found
@@ -315,27 +365,136 @@ def brute_force(
     print(f"Finished with {loops_found=}")
 
 
-def run_guard(guard: Guard, the_map: list[list[str]]) -> int:
+STEPS: dict[Direction, tuple[int, int]] = {
+    Direction.UP: (0, -1),
+    Direction.RIGHT: (1, 0),
+    Direction.DOWN: (0, 1),
+    Direction.LEFT: (-1, 0),
+}
+
+
+def guard_path(guard: Guard) -> list[tuple[Coordinate, Direction]]:
+    """Order the positions of a guard that has already run by step index."""
+    return [
+        (position[0], position[1])
+        for position in sorted(guard.positions, key=lambda pos: pos[2])
+    ]
+
+
+def loops_with_obstacle(
+    the_map: list[list[str]],
+    start: Coordinate,
+    direction: Direction,
+    obstacle: Coordinate,
+    visited: VisitedStates | None = None,
+) -> bool:
+    """Run the guard from start with an extra obstacle overlaid on the map.
+
+    The map itself is never modified so it can be shared between trials.
+    """
+    height = len(the_map)
+    width = len(the_map[0])
+    if visited is None:
+        visited = VisitedStates(width=width, height=height)
+    else:
+        visited.reset()
+    x, y = start
+    while True:
+        dx, dy = STEPS[direction]
+        next_x, next_y = x + dx, y + dy
+        if not (0 <= next_x < width and 0 <= next_y < height):
+            return False
+        if the_map[next_y][next_x] == "#" or (next_x, next_y) == obstacle:
+            if visited.test_and_set(x, y, direction):
+                return True
+            direction = rotate(direction)
+            continue
+        x, y = next_x, next_y
+
+
+def obstruction_candidates(
+    guard: Guard,
+) -> list[tuple[Coordinate, Direction, Coordinate]]:
+    """Get each new obstacle location with the guard state just before it.
+
+    Only the first time the guard walks onto a cell matters, placing the
+    obstacle there means the guard never reaches any later visit.
+    """
+    path = guard_path(guard)
+    start = path[0][0]
+    tested_coords: set[Coordinate] = {start}
+    candidates = []
+    for (previous, _), (coordinate, direction) in pairwise(path):
+        if coordinate in tested_coords:
+            continue
+        tested_coords.add(coordinate)
+        candidates.append((previous, direction, coordinate))
+    return candidates
+
+
+def _init_shared_map(the_map: list[list[str]]):
+    """Give a worker process its copy of the map, once."""
+    global _SHARED_MAP, _SHARED_VISITED  # pylint: disable=global-statement
+    _SHARED_MAP = the_map
+    _SHARED_VISITED = VisitedStates.for_map(the_map)
+
+
+def _check_candidate(
+    candidate: tuple[Coordinate, Direction, Coordinate],
+) -> bool:
+    """Worker side of the obstruction search."""
+    start, direction, obstacle = candidate
+    return loops_with_obstacle(
+        _SHARED_MAP, start, direction, obstacle, _SHARED_VISITED
+    )
+
+
+def obstruction_search(
+    guard: Guard,
+    the_map: list[list[str]],
+    processes: int | None = None,
+    chunksize: int = 64,
+) -> int:
+    """Count obstacle locations that trap the guard, using a process pool.
+
+    The guard must already have been run on the map.
+    """
+    candidates = obstruction_candidates(guard)
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        initializer=_init_shared_map,
+        initargs=(the_map,),
+    ) as executor:
+        loops_found = sum(
+            executor.map(_check_candidate, candidates, chunksize=chunksize)
+        )
+    print(f"Finished with {loops_found=}")
+    return loops_found
+
+
+def run_guard(
+    guard: Guard,
+    the_map: list[list[str]],
+    visited: VisitedStates | None = None,
+) -> int:
     """Map out the guard path."""
+    if visited is None:
+        visited = VisitedStates.for_map(the_map)
+    else:
+        visited.reset()
     while not guard.left_area:
         guard.location = get_turn_coordinate(
             guard.location, guard.direction, the_map, guard
         )
-        if guard.location not in guard.turn_positions:
-            guard.turn_positions.append(guard.location)
-            guard.turn_directions.append(guard.direction)
-        # Check we aren't in a corner by referencing directions.
-        elif any(
-            pos == guard.location and turn == guard.direction
-            for pos, turn in zip(guard.turn_positions, guard.turn_directions)
+        # Turning at the same spot facing the same way means a loop.
+        if visited.test_and_set(
+            guard.location.x, guard.location.y, guard.direction
         ):
             # print("Loop found")
             guard.loops_found += 1
             break
-        else:
-            # We in a corner, append.
-            guard.turn_positions.append(guard.location)
-            guard.turn_directions.append(guard.direction)
+        guard.turn_positions.append(guard.location)
+        guard.turn_directions.append(guard.direction)
 
         # Break if the guard got out.
         if guard.left_area:
@@ -378,6 +537,7 @@ def debug_and_tests():
     run_guard(guard, guard_map)
     print("BRUTE FORCE BEGIN")
     brute_force(guard, guard_map)
+    assert 6 == obstruction_search(guard, guard_map)
     # KNOWN_OBSTACLES = [
     #     Coordinate(3, 6),
     #     Coordinate(6, 7),
@@ -433,8 +593,8 @@ def main():
     #     f"Final amount of possible places to put an obstacle = {len(future_obstacle_positions)}"
     # )
     # 1895 was also too low...
-    print("BRUTE FORCE BEGIN")
-    brute_force(guard, guard_map)
+    print("OBSTRUCTION SEARCH BEGIN")
+    obstruction_search(guard, guard_map)
 
 
 if __name__ == "__main__":
@@ -2,10 +2,28 @@
 
 import operator
 import re
+from bisect import bisect_right
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass, field
-from itertools import cycle, islice, pairwise, product
+from itertools import cycle, islice
 
-OPS = ["+", "*", "||"]
+POWERS_OF_TEN = [10**i for i in range(40)]
+# Values never go negative, so this can flag "any left side works".
+ANY_PREFIX = -1
+
+
+@dataclass(frozen=True)
+class Operator:
+    """An operator the equations can use, along with its inverse.
+
+    undo(target, b) returns the a where apply(a, b) == target, None when
+    there isn't one, or ANY_PREFIX when every a works.
+    """
+
+    symbol: str
+    apply: Callable[[int, int], int]
+    undo: Callable[[int, int], int | None]
 
 
 @dataclass
@@ -16,23 +34,6 @@ class Equation:
     numbers: list[int] = field(default_factory=list)
     solvable: bool = False
     solutions: list = field(default_factory=list)
-    number_pairs: list[tuple[int, int]] = field(default_factory=list)
-    operator_products: list[list[str]] = field(default_factory=list)
-    all_evals: list[list] = field(default_factory=list)
-
-    def __post_init__(self):
-        self.number_pairs = list(pairwise(self.numbers))
-        self._generate_operators()
-        self._generate_evals()
-
-    def _generate_operators(self):
-        # products = product(OPS, repeat=len(self.number_pairs))
-        for pro in product(OPS, repeat=len(self.number_pairs)):
-            self.operator_products.append(list(pro))
-
-    def _generate_evals(self):
-        for pro in self.operator_products:
-            self.all_evals.append(list(roundrobin(self.numbers, pro)))
 
 
 def get_input(filename: str) -> list[Equation]:
@@ -73,13 +74,58 @@ def sum_true_equations(equations: list[Equation]) -> int:
     return answer
 
 
+def digit_count(number: int) -> int:
+    """Count the decimal digits in a non-negative int."""
+    if number >= POWERS_OF_TEN[-1]:
+        return len(str(number))
+    return bisect_right(POWERS_OF_TEN, number) or 1
+
+
+def concat_shift(b: int) -> int:
+    """Power of ten that shifts a left far enough to append b."""
+    digits = digit_count(b)
+    if digits < len(POWERS_OF_TEN):
+        return POWERS_OF_TEN[digits]
+    return 10**digits
+
+
 def my_concat(a: int, b: int) -> int:
     """Combine two ints into 1 int."""
-    return int((str(a) + str(b)))
+    return a * concat_shift(b) + b
+
+
+def undo_add(target: int, b: int) -> int | None:
+    """Inverse of "+", values never go negative."""
+    return target - b if target >= b else None
+
+
+def undo_mul(target: int, b: int) -> int | None:
+    """Inverse of "*", only possible when it divides exactly.
+
+    Multiplying by 0 loses the left side, so any left side makes 0.
+    """
+    if b == 0:
+        return ANY_PREFIX if target == 0 else None
+    a, remainder = divmod(target, b)
+    return None if remainder else a
+
+
+def undo_concat(target: int, b: int) -> int | None:
+    """Inverse of "||", target has to end in the digits of b."""
+    a, remainder = divmod(target, concat_shift(b))
+    return a if remainder == b and a else None
+
+
+OPS = [
+    Operator("+", operator.add, undo_add),
+    Operator("*", operator.mul, undo_mul),
+    Operator("||", my_concat, undo_concat),
+]
 
 
 def solve_equation(equation: list) -> int:
     """Run the equation for a result"""
+    operations = {op.symbol: op.apply for op in OPS}
     carry: int = 0
     operation = None
     for i, e in enumerate(equation):
@@ -87,29 +133,86 @@ def solve_equation(equation: list) -> int:
         if i == 0:
             carry = e
             continue
-        if e == "+":
-            operation = operator.add
-            continue
-        if e == "*":
-            operation = operator.mul
-            continue
-        if e == "||":
-            operation = my_concat
+        if e in operations:
+            operation = operations[e]
             continue
         if operation is not None:
             carry = operation(carry, e)
     return carry
 
 
+def _unsolve(
+    target: int, numbers: list[int], index: int, ops: list[Operator]
+) -> list[str] | None:
+    """Undo the operator before numbers[index], pruning impossible branches.
+
+    Returns the operators that make numbers[:index + 1] equal target.
+    """
+    last = numbers[index]
+    if index == 0:
+        return [] if target == last else None
+    for op in ops:
+        previous = op.undo(target, last)
+        if previous is None:
+            continue
+        if previous == ANY_PREFIX:
+            # Whatever numbers[:index] makes, so fill in any operators.
+            return [ops[0].symbol] * (index - 1) + [op.symbol]
+        solution = _unsolve(previous, numbers, index - 1, ops)
+        if solution is not None:
+            solution.append(op.symbol)
+            return solution
+    return None
+
+
+def solve_backwards(
+    test_value: int, numbers: list[int], ops: list[Operator] | None = None
+) -> list[str] | None:
+    """Find operators that make numbers equal test_value, or None."""
+    return _unsolve(
+        test_value, numbers, len(numbers) - 1, OPS if ops is None else ops
+    )
+
+
 def evaluate_equations(equations: list[Equation]):
     """Check all the equations for solvable"""
     for equation in equations:
-        for evaluation in equation.all_evals:
-            # print(f"{equation.test_value=},{evaluation=}")
-            if equation.test_value == solve_equation(evaluation):
-                equation.solvable = True
-                equation.solutions.append(evaluation)
-                break
+        ops = solve_backwards(equation.test_value, equation.numbers)
+        if ops is not None:
+            equation.solvable = True
+            equation.solutions.append(list(roundrobin(equation.numbers, ops)))
+
+
+def _calibrate_chunk(chunk: list[tuple[int, list[int]]]) -> int:
+    """Worker side of calibrate, sum the solvable test values in a chunk."""
+    return sum(
+        test_value
+        for test_value, numbers in chunk
+        if solve_backwards(test_value, numbers) is not None
+    )
+
+
+def calibrate(
+    equations: list[Equation],
+    processes: int | None = None,
+    chunksize: int = 256,
+) -> int:
+    """Sum the solvable equations, spreading chunks over a process pool."""
+    pairs = [(equation.test_value, equation.numbers) for equation in equations]
+    chunks = [
+        pairs[start : start + chunksize]
+        for start in range(0, len(pairs), chunksize)
+    ]
+    answer = 0
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(_calibrate_chunk, chunk) for chunk in chunks
+        ]
+        for done, future in enumerate(as_completed(futures), start=1):
+            answer += future.result()
+            print(f"Chunk {done}/{len(chunks)}: running total = {answer}")
+    print(f"Final calibration = {answer}")
+    return answer
 
 
 def debug_and_tests():
@@ -129,15 +232,40 @@ def debug_and_tests():
         [easy_test_equ_add_good, easy_test_equ_mul_good]
     )
     assert 2 == solve_equation([2, "*", 1])
+    assert ["+", "*", "+"] == solve_backwards(292, [11, 6, 16, 20])
+    assert 156 == my_concat(15, 6)
+    assert 100 == my_concat(10, 0)
+    assert 15 == undo_concat(156, 6)
+    assert undo_concat(6, 6) is None
+    assert undo_concat(156, 16) is None
+    assert 7 == digit_count(1234567)
+    assert 1 == digit_count(0)
+    assert solve_backwards(156, [15, 6], OPS[:2]) is None
+    assert solve_backwards(83, [17, 5]) is None
+    assert ["*"] == solve_backwards(0, [5, 0])
+    assert ["+", "*"] == solve_backwards(0, [3, 4, 0])
+    assert ANY_PREFIX == undo_mul(0, 0)
+    assert undo_mul(7, 0) is None
     evaluate_equations(equations)
+    for equation in equations:
+        for solution in equation.solutions:
+            assert equation.test_value == solve_equation(solution)
     assert 11387 == sum_true_equations(equations)
+    assert 11387 == calibrate(equations, chunksize=2)
+
+    # Long equations should solve without enumerating 3^n combinations.
+    numbers = [7, 3, 12, 9, 4, 5, 8, 2, 6, 11, 3, 7, 9, 2, 4, 8, 5, 6, 3, 2, 9]
+    ops = ["*", "+", "||", "*", "+", "||", "+", "*", "||", "+"] * 2
+    long_value = solve_equation(list(roundrobin(numbers, ops)))
+    long_ops = solve_backwards(long_value, numbers)
+    assert long_ops is not None
+    assert long_value == solve_equation(list(roundrobin(numbers, long_ops)))
 
 
 def main():
     """Get the answer"""
     equations = get_input("day7input")
-    evaluate_equations(equations)
-    sum_true_equations(equations)
+    calibrate(equations)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,14 @@
 """Code for day 8"""
 
 from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
+from functools import reduce
 from itertools import combinations, filterfalse
+from math import gcd
+from operator import or_
+
+import numpy as np
 
 
 @dataclass(order=True)
@@ -191,6 +197,211 @@ def get_all_antinodes(grid: Grid) -> list[Antinode]:
     )
 
 
+def _step_bounds(position: int, step: int, limit: int) -> tuple[int, int]:
+    """Smallest and largest t keeping position + t * step within 0..limit."""
+    if step > 0:
+        return -(position // step), (limit - position) // step
+    return -((limit - position) // -step), position // -step
+
+
+def antinode_line(
+    antenna1: Antenna, antenna2: Antenna, max_x: int, max_y: int
+) -> range:
+    """Flat indexes of every in-bounds grid point on the line through two
+    antennas.
+
+    The step between antennas is reduced by its gcd so no lattice point on
+    the line gets skipped. Along the line the flat index is an arithmetic
+    progression, so the whole line is a single range.
+    """
+    dx = antenna2.x - antenna1.x
+    dy = antenna2.y - antenna1.y
+    divisor = gcd(dx, dy)
+    dx, dy = dx // divisor, dy // divisor
+    width = max_x + 1
+    # Face the step so flat indexes go up along the line.
+    if dy < 0 or (dy == 0 and dx < 0):
+        dx, dy = -dx, -dy
+
+    low, high = _step_bounds(antenna1.y, dy, max_y) if dy else (None, None)
+    if dx:
+        low_x, high_x = _step_bounds(antenna1.x, dx, max_x)
+        low = low_x if low is None else max(low, low_x)
+        high = high_x if high is None else min(high, high_x)
+
+    stride = dy * width + dx
+    origin = antenna1.y * width + antenna1.x
+    return range(origin + low * stride, origin + high * stride + 1, stride)
+
+
+def mark_antinode_lines(
+    occupied: bytearray,
+    antenna1: Antenna,
+    antenna2: Antenna,
+    max_x: int,
+    max_y: int,
+):
+    """Mark the line through two antennas with one slice assignment."""
+    line = antinode_line(antenna1, antenna2, max_x, max_y)
+    occupied[line.start : line.stop : line.step] = b"\x01" * len(line)
+
+
+@dataclass
+class AntinodeMap:
+    """Antinodes kept up to date as antennas are added and removed.
+
+    Each cell keeps a count of how many antenna pair lines cross it, so a
+    change only touches the pairs involving the one antenna.
+    """
+
+    max_x: int
+    max_y: int
+    signal_group: dict[str, list[Antenna]] = field(default_factory=dict)
+    counts: list[int] = field(init=False)
+    unique: int = field(default=0, init=False)
+
+    def __post_init__(self):
+        self.counts = [0] * ((self.max_x + 1) * (self.max_y + 1))
+        antennas = [a for group in self.signal_group.values() for a in group]
+        self.signal_group = {}
+        for antenna in antennas:
+            self.add_antenna(antenna)
+
+    @classmethod
+    def from_grid(cls, grid: Grid) -> "AntinodeMap":
+        """Build the map from the antennas already on a grid."""
+        return cls(
+            max_x=grid.max_x,
+            max_y=grid.max_y,
+            signal_group={k: list(v) for k, v in grid.signal_group.items()},
+        )
+
+    def _update_line(self, antenna1: Antenna, antenna2: Antenna, change: int):
+        """Add or remove one pair's line from the counts."""
+        counts = self.counts
+        for index in antinode_line(
+            antenna1, antenna2, self.max_x, self.max_y
+        ):
+            before = counts[index]
+            counts[index] = before + change
+            if before == 0:
+                self.unique += 1
+            elif before + change == 0:
+                self.unique -= 1
+
+    def add_antenna(self, antenna: Antenna):
+        """Place an antenna, adding lines to the others on its frequency."""
+        group = self.signal_group.setdefault(antenna.signal, [])
+        if antenna in group:
+            raise ValueError(f"{antenna} is already on the map")
+        for other in group:
+            self._update_line(other, antenna, 1)
+        group.append(antenna)
+
+    def remove_antenna(self, antenna: Antenna):
+        """Take an antenna away along with the lines it was part of."""
+        group = self.signal_group.get(antenna.signal, [])
+        if antenna not in group:
+            raise ValueError(f"{antenna} isn't on the map")
+        group.remove(antenna)
+        for other in group:
+            self._update_line(other, antenna, -1)
+
+
+def _step_bounds_array(
+    position: np.ndarray, step: np.ndarray, limit: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """_step_bounds for arrays of pairs. A zero step never leaves the grid,
+    so it's left unbounded and the other axis decides.
+    """
+    size = np.maximum(np.abs(step), 1)
+    forward = step > 0
+    low = np.where(
+        forward, -(position // size), -((limit - position) // size)
+    )
+    high = np.where(forward, (limit - position) // size, position // size)
+    unbounded = step == 0
+    low[unbounded] = -(2**62)
+    high[unbounded] = 2**62
+    return low, high
+
+
+def frequency_antinodes(
+    antennas: list[Antenna], max_x: int, max_y: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """(ys, xs) of every antinode of one frequency, with repeats.
+
+    All the pair steps are worked out at once and reduced by their gcd so
+    no lattice point gets skipped, then each pair's in-bounds multiples
+    come from one arange.
+    """
+    points = np.array([(a.x, a.y) for a in antennas], dtype=np.int64)
+    first, second = np.triu_indices(len(points), 1)
+    origin = points[first]
+    step = points[second] - origin
+    step //= np.gcd(step[:, 0], step[:, 1])[:, None]
+
+    low_x, high_x = _step_bounds_array(origin[:, 0], step[:, 0], max_x)
+    low_y, high_y = _step_bounds_array(origin[:, 1], step[:, 1], max_y)
+    low = np.maximum(low_x, low_y)
+    counts = np.minimum(high_x, high_y) - low + 1
+
+    # One entry per antinode, t counts along its pair's line from low.
+    pair = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    t = np.arange(counts.sum()) - starts[pair] + low[pair]
+    where = origin[pair] + t[:, None] * step[pair]
+    return where[:, 1], where[:, 0]
+
+
+def antinode_occupancy(grid: Grid) -> np.ndarray:
+    """Boolean occupancy of every antinode on the grid."""
+    occupied = np.zeros((grid.max_y + 1, grid.max_x + 1), dtype=bool)
+    for antennas in grid.signal_group.values():
+        occupied[frequency_antinodes(antennas, grid.max_x, grid.max_y)] = True
+    return occupied
+
+
+def frequency_bitmap(
+    antennas: list[Antenna], max_x: int, max_y: int
+) -> int:
+    """Antinodes of one frequency packed into an int, bit i for cell i."""
+    occupied = bytearray((max_x + 1) * (max_y + 1))
+    for antenna1, antenna2 in combinations(antennas, 2):
+        mark_antinode_lines(occupied, antenna1, antenna2, max_x, max_y)
+    # Cell 0 has to end up as the lowest bit.
+    bits = occupied.translate(bytes.maketrans(b"\x00\x01", b"01"))[::-1]
+    return int(bits, 2)
+
+
+def _frequency_bitmap_task(task: tuple[list[Antenna], int, int]) -> int:
+    """Worker side of parallel_antinode_count."""
+    return frequency_bitmap(*task)
+
+
+def parallel_antinode_count(grid: Grid, processes: int | None = None) -> int:
+    """Count unique antinodes with each frequency done in its own process.
+
+    Workers send back a packed bitmap that gets OR'd into the total.
+    """
+    tasks = [
+        (antennas, grid.max_x, grid.max_y)
+        for antennas in grid.signal_group.values()
+    ]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        covered = reduce(or_, executor.map(_frequency_bitmap_task, tasks), 0)
+    count = covered.bit_count()
+    print(f"There are {count} unique locations with an antinode.")
+    return count
+
+
+def count_antinodes(grid: Grid) -> int:
+    """Count unique antinode locations using the occupancy array."""
+    count = int(antinode_occupancy(grid).sum())
+    print(f"There are {count} unique locations with an antinode.")
+    return count
+
+
 def unique_antinodes(antinodes: list[Antinode]) -> int:
     """Return the count of unique antinode coordinates"""
     anti_set = set()
@@ -221,14 +432,48 @@ def debug_and_tests():
         grid.mark_antinode(antinode)
     print(grid)
     assert 34 == unique_location_count
+    assert 34 == count_antinodes(Grid(initial_map=get_input("day8example")))
+    assert 34 == parallel_antinode_count(
+        Grid(initial_map=get_input("day8example"))
+    )
+    assert 0b1001 == frequency_bitmap(
+        [Antenna("a", 0, 0), Antenna("a", 1, 1)], max_x=1, max_y=1
+    )
+
+    # Steps with a common factor still hit the points in between.
+    ys, xs = frequency_antinodes(
+        [Antenna("a", 2, 2), Antenna("a", 6, 6)], max_x=9, max_y=9
+    )
+    assert list(range(10)) == sorted(xs.tolist()) == sorted(ys.tolist())
+    occupied = bytearray(100)
+    mark_antinode_lines(
+        occupied, Antenna("a", 2, 2), Antenna("a", 6, 6), max_x=9, max_y=9
+    )
+    assert [i * 11 for i in range(10)] == [
+        i for i, cell in enumerate(occupied) if cell
+    ]
+
+    antinode_map = AntinodeMap.from_grid(
+        Grid(initial_map=get_input("day8example"))
+    )
+    assert 34 == antinode_map.unique
+    extras = [Antenna(signal="z", x=3, y=3), Antenna(signal="z", x=4, y=5)]
+    changed_map = get_input("day8example")
+    for extra in extras:
+        antinode_map.add_antenna(extra)
+        changed_map[extra.y][extra.x] = extra.signal
+    assert 38 == antinode_map.unique
+    assert 38 == count_antinodes(Grid(initial_map=changed_map))
+    for extra in extras:
+        antinode_map.remove_antenna(extra)
+    assert 34 == antinode_map.unique
 
 
 def main():
     """Get the answer"""
     city_map = get_input("day8input")
     grid = Grid(initial_map=city_map)
-    antinodes = get_all_antinodes(grid)
-    unique_antinodes(antinodes)
+    parallel_antinode_count(grid)
 
 
 if __name__ == "__main__":
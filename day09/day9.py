@@ -64,6 +64,54 @@ def defrag(filesystem: deque):
         # print(filesystem)
 
 
+def span_checksum(file_id: int, start: int, length: int) -> int:
+    """Checksum of one file span, file_id * (start + ... + start+length-1)."""
+    return file_id * length * (2 * start + length - 1) // 2
+
+
+def spans_checksum(spans: list[tuple[int, int, int]]) -> int:
+    """Calculate the checksum from (file_id, start, length) spans."""
+    return sum(span_checksum(*span) for span in spans)
+
+
+def compact_blocks(disk_map: str) -> list[tuple[int, int, int]]:
+    """Move blocks from the end into the first gaps.
+
+    Two cursors walk the disk map from both ends, so the map is never
+    expanded into individual blocks. Returns (file_id, start, length) spans
+    of the compacted disk.
+    """
+    lengths = [int(c) for c in disk_map]
+    spans: list[tuple[int, int, int]] = []
+    position: int = 0
+    left: int = 0
+    # Right cursor always sits on a file (even index).
+    right: int = len(lengths) - 1 - (len(lengths) - 1) % 2
+    remaining: int = lengths[right]
+    while left < right:
+        if not left % 2:
+            # File that stays in place.
+            spans.append((left // 2, position, lengths[left]))
+            position += lengths[left]
+        else:
+            # Gap that gets filled from the right.
+            gap = lengths[left]
+            while gap and left < right:
+                take = min(gap, remaining)
+                spans.append((right // 2, position, take))
+                position += take
+                gap -= take
+                remaining -= take
+                if not remaining:
+                    right -= 2
+                    remaining = lengths[right]
+        left += 1
+    if left == right:
+        # Whatever of the last file didn't get moved.
+        spans.append((right // 2, position, remaining))
+    return spans
+
+
 def calc_checksum(filesystem: deque) -> int:
     """Calculate the checksum for the filesystem."""
     checksum: int = 0
@@ -91,15 +139,19 @@ def debug_and_tests():
     for i, j in zip("0099811188827773336446555566..............", filesystem):
         assert i == str(j)
     assert 1928 == calc_checksum(filesystem)
+    assert 1928 == spans_checksum(compact_blocks(disk_map))
+    # Last file is only partly moved: 022111222......
+    assert [(0, 0, 1), (2, 1, 2), (1, 3, 3), (2, 6, 3)] == compact_blocks(
+        "12345"
+    )
+    assert 60 == spans_checksum(compact_blocks("12345"))
 
 
 def main():
     """Get the answer"""
     disk_map = get_input("day9input")
-    filesystem = disk_map_to_filesystem(disk_map)
     print("STARTING DEFRAG")
-    defrag(filesystem)
-    print(calc_checksum(filesystem))
+    print(spans_checksum(compact_blocks(disk_map)))
 
 
 if __name__ == "__main__":
@@ -1,8 +1,11 @@
 """Code for day 9 part 2"""
 
+import heapq
 from collections import deque
 from itertools import repeat, islice
 
+from day9 import span_checksum, spans_checksum
+
 last_file_id_inspected: int = 0
 
 
@@ -126,6 +129,64 @@ def defrag2(filesystem: deque):
         last_file_id -= 1
 
 
+def disk_map_to_spans(
+    disk_map: str,
+) -> tuple[list[tuple[int, int]], list[tuple[int, int]]]:
+    """Read the disk map into (start, length) spans of files and gaps.
+
+    Files are listed by file ID.
+    """
+    files: list[tuple[int, int]] = []
+    gaps: list[tuple[int, int]] = []
+    position = 0
+    for i, c in enumerate(disk_map):
+        length = int(c)
+        # Evens -> File
+        if not i % 2:
+            files.append((position, length))
+        elif length:
+            gaps.append((position, length))
+        position += length
+    return files, gaps
+
+
+def compact_files(disk_map: str) -> list[tuple[int, int, int]]:
+    """Move whole files into the leftmost gap that fits, last file first.
+
+    Gap starts are kept in one min-heap per gap size (1-9), so finding the
+    leftmost fitting gap only looks at the top of at most 9 heaps. Returns
+    (file_id, start, length) spans.
+    """
+    files, gaps = disk_map_to_spans(disk_map)
+    gap_heaps: list[list[int]] = [[] for _ in range(10)]
+    for start, length in gaps:
+        # Gaps come in order, so appending keeps each heap valid.
+        gap_heaps[length].append(start)
+
+    for file_id in range(len(files) - 1, 0, -1):
+        file_start, file_length = files[file_id]
+        best_start, best_size = file_start, 0
+        for size in range(file_length, 10):
+            heap = gap_heaps[size]
+            if heap and heap[0] < best_start:
+                best_start, best_size = heap[0], size
+        if not best_size:
+            # No space for file further forward.
+            continue
+        heapq.heappop(gap_heaps[best_size])
+        files[file_id] = (best_start, file_length)
+        remaining = best_size - file_length
+        if remaining:
+            heapq.heappush(gap_heaps[remaining], best_start + file_length)
+        # The space the file left behind is past every file still to move,
+        # so it never needs to go back into a heap.
+
+    return [
+        (file_id, start, length)
+        for file_id, (start, length) in enumerate(files)
+    ]
+
+
 def calc_checksum(filesystem: deque) -> int:
     """Calculate the checksum for the filesystem."""
     checksum: int = 0
@@ -160,6 +221,11 @@ def debug_and_tests():
         assert i == str(j)
     final_checksum = calc_checksum(filesystem)
     assert final_checksum == 2858
+    assert 2858 == spans_checksum(compact_files(disk_map))
+    assert 5 * (7 + 8 + 9) == span_checksum(5, 7, 3)
+    assert 0 == span_checksum(5, 7, 0)
+    # A file bigger than every gap stays where it is.
+    assert [(0, 0, 1), (1, 3, 3)] == compact_files("123")
     print(f"Final Checksum = {final_checksum}")
     print(list(filesystem))
 
@@ -167,10 +233,8 @@ def debug_and_tests():
 def main():
     """Get the answer"""
     disk_map = get_input("day9input")
-    filesystem = disk_map_to_filesystem(disk_map)
     print("STARTING DEFRAG")
-    defrag2(filesystem)
-    print(calc_checksum(filesystem))
+    print(spans_checksum(compact_files(disk_map)))
 
 
 if __name__ == "__main__":
@@ -3,6 +3,8 @@
 from dataclasses import dataclass, field
 from enum import StrEnum, auto
 
+import numpy as np
+
 
 class Direction(StrEnum):
     """Directions the trail can go."""
@@ -181,6 +183,91 @@ def chart_path(trailhead: Trailhead, topo_map: Grid):
         paths.extend(find_next_path(path, topo_map, trailhead))
 
 
+def score_and_rate(topo_map: list[list[str]]) -> tuple[int, int]:
+    """Return the (score, rating) sums over all trailheads in one sweep.
+
+    Cells are grouped by height and worked from 9 down to 0. Each cell's
+    rating is the sum of the ratings of its one-higher neighbors, and the
+    summits it reaches are the union of theirs, kept as an int bitset with
+    one bit per 9.
+    """
+    height = len(topo_map)
+    width = len(max(topo_map, key=len))
+    layers: list[list[tuple[int, int]]] = [[] for _ in range(10)]
+    heights = [[-1] * width for _ in range(height)]
+    for y, row in enumerate(topo_map):
+        for x, c in enumerate(row):
+            # Catch example dots.
+            if c != ".":
+                heights[y][x] = int(c)
+                layers[int(c)].append((x, y))
+
+    ratings = [[0] * width for _ in range(height)]
+    summits = [[0] * width for _ in range(height)]
+    for i, (x, y) in enumerate(layers[9]):
+        ratings[y][x] = 1
+        summits[y][x] = 1 << i
+
+    for level in range(8, -1, -1):
+        for x, y in layers[level]:
+            rating = 0
+            reached = 0
+            for nx, ny in ((x, y - 1), (x + 1, y), (x, y + 1), (x - 1, y)):
+                if (
+                    0 <= nx < width
+                    and 0 <= ny < height
+                    and heights[ny][nx] == level + 1
+                ):
+                    rating += ratings[ny][nx]
+                    reached |= summits[ny][nx]
+            ratings[y][x] = rating
+            summits[y][x] = reached
+
+    score = sum(summits[y][x].bit_count() for x, y in layers[0])
+    rating = sum(ratings[y][x] for x, y in layers[0])
+    print(f"Trailhead score sum {score}, rating sum {rating}")
+    return score, rating
+
+
+def load_heights(filename: str) -> np.ndarray:
+    """Read the map into a padded 2D uint8 array of heights.
+
+    Dots and a border all the way around become 255, so every height has
+    four neighbors in the array.
+    """
+    with open(filename, "rb") as input_data:
+        raw = input_data.read().strip() + b"\n"
+    stride = raw.index(b"\n") + 1
+    table = bytes.maketrans(b"0123456789.\n", bytes([*range(10), 255, 255]))
+    # The newline column already pads the right hand side.
+    heights = np.frombuffer(raw.translate(table), dtype=np.uint8)
+    heights = heights.reshape(-1, stride)
+    return np.pad(heights, ((1, 1), (1, 0)), constant_values=255)
+
+
+def rate_heights(heights: np.ndarray) -> int:
+    """Sum the trailhead ratings, one vectorized step per height.
+
+    Only the layer just above has ratings while a layer is worked, so each
+    cell's rating is the sum of the four shifted copies of that layer, kept
+    where the height matches.
+    """
+    inner = heights[1:-1, 1:-1]
+    # A trailhead has at most 4 * 3**8 trails, so uint16 never overflows.
+    ratings = (heights == 9).astype(np.uint16)
+    below = np.zeros_like(ratings)
+    for level in range(8, -1, -1):
+        total = below[1:-1, 1:-1]
+        np.add(ratings[:-2, 1:-1], ratings[2:, 1:-1], out=total)
+        total += ratings[1:-1, :-2]
+        total += ratings[1:-1, 2:]
+        total *= inner == level
+        ratings, below = below, ratings
+    rating = int(ratings.sum(dtype=np.uint64))
+    print(f"Trailhead rating sum {rating}")
+    return rating
+
+
 def debug_and_tests():
     """Test using the sample and examples first."""
     # 1 trailhead, 3 score.
@@ -219,16 +306,17 @@ def debug_and_tests():
         chart_path(trailhead, grid)
     assert 81 == grid.sum_trailheads()
 
+    assert (36, 81) == score_and_rate(get_input("day10example"))
+    assert 3 == score_and_rate(get_input("day10example4"))[1]
+    assert 13 == score_and_rate(get_input("day10example5"))[1]
+    assert 227 == score_and_rate(get_input("day10example6"))[1]
+    assert 81 == rate_heights(load_heights("day10example"))
+    assert 227 == rate_heights(load_heights("day10example6"))
+
 
 def main():
     """Get the answer"""
-    topo_map = get_input("day10input")
-    grid = Grid(initial_map=topo_map)
-    print(f"Found {len(grid.trailheads)} trailheads.")
-    for i, trailhead in enumerate(grid.trailheads):
-        print(f"Trailblazing {i+1}/{len(grid.trailheads)}")
-        chart_path(trailhead, grid)
-    grid.sum_trailheads()
+    rate_heights(load_heights("day10input"))
 
 
 if __name__ == "__main__":
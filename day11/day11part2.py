@@ -7,7 +7,17 @@ Used https://www.youtube.com/watch?v=b-1WDxUlubc as a guide.
 
 import cProfile
 import math
+import random
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
 from functools import cache
+from itertools import accumulate, chain
+from operator import add
+
+POWERS_OF_TEN = [10**i for i in range(40)]
 
 
 def get_input_dict(filename: str) -> dict:
@@ -70,6 +80,235 @@ def blink(stones: dict, qty: int = 1) -> dict:
     return stones
 
 
+def digit_count(stone: int) -> int:
+    """Number of digits in the stone, looked up from the powers of ten."""
+    if stone >= POWERS_OF_TEN[-1]:
+        return len(str(stone))
+    return bisect_right(POWERS_OF_TEN, stone) or 1
+
+
+@cache
+def next_stones(stone: int) -> tuple[int, ...]:
+    """The stone(s) this stone turns into after one blink."""
+    if stone == 0:
+        return (1,)
+    digits = digit_count(stone)
+    if digits % 2 == 0:
+        half = digits // 2
+        if half < len(POWERS_OF_TEN):
+            return divmod(stone, POWERS_OF_TEN[half])
+        return divmod(stone, 10**half)
+    return (stone * 2024,)
+
+
+def reachable_stones(stones: Iterable[int]) -> set[int]:
+    """Every stone value that can ever show up from the given stones."""
+    seen = set(stones)
+    to_visit = list(seen)
+    while to_visit:
+        for child in next_stones(to_visit.pop()):
+            if child not in seen:
+                seen.add(child)
+                to_visit.append(child)
+    return seen
+
+
+def stone_levels(stones: Iterable[int], limit: int) -> list[list[int]]:
+    """Stones grouped by the fewest blinks it takes to reach them, for up
+    to limit blinks.
+    """
+    seen = set(stones)
+    levels = [list(seen)]
+    for _ in range(limit):
+        level = []
+        for stone in levels[-1]:
+            for child in next_stones(stone):
+                if child not in seen:
+                    seen.add(child)
+                    level.append(child)
+        if not level:
+            break
+        levels.append(level)
+    return levels
+
+
+@dataclass
+class StoneEvolver:
+    """Counts stones after a number of blinks, memoized on
+    (stone, remaining_blinks) with an LRU bound on the memo.
+
+    count_all works one blink level at a time, and only for the stones
+    close enough to the start to matter at that level. Each level only
+    reads the one below, so just those two are kept, as plain lists that
+    never hold more than the reachable stones. The LRU memo keeps finished
+    counts so asking again is instant, and evicting from it only means a
+    later question gets worked out again.
+    """
+
+    maxsize: int = 2**16
+    memo: OrderedDict[tuple[int, int], int] = field(
+        default_factory=OrderedDict
+    )
+
+    def _store(self, key: tuple[int, int], value: int):
+        """Memoize a count, dropping the least recently used if full."""
+        self.memo[key] = value
+        if len(self.memo) > self.maxsize:
+            self.memo.popitem(last=False)
+
+    def count_all(self, stones: dict, blinks: int) -> int:
+        """Total stones after blinking, for a dict of stone -> count."""
+        if blinks == 0:
+            return sum(stones.values())
+        if all((stone, blinks) in self.memo for stone in stones):
+            total = 0
+            for stone, freq in stones.items():
+                self.memo.move_to_end((stone, blinks))
+                total += freq * self.memo[(stone, blinks)]
+            return total
+
+        # Stones more than blinks - remaining in never need that count, and
+        # numbering them by depth makes the ones that do a prefix.
+        levels = stone_levels(stones, blinks - 1)
+        order = list(chain.from_iterable(levels))
+        ids = {stone: i for i, stone in enumerate(order)}
+        within = list(accumulate(map(len, levels)))
+        # Each stone's one or two children as ids, -1 when there's no
+        # second child. Every level list ends in a 0 for the -1 to read.
+        first: list[int] = []
+        second: list[int] = []
+        for stone in order:
+            children = next_stones(stone)
+            first.append(ids.get(children[0], -1))
+            if len(children) > 1:
+                second.append(ids.get(children[1], -1))
+            else:
+                second.append(-1)
+        below = [len(next_stones(stone)) for stone in order] + [0]
+        for remaining in range(2, blinks + 1):
+            needed = within[min(blinks - remaining, len(within) - 1)]
+            below = list(
+                map(
+                    add,
+                    map(below.__getitem__, first[:needed]),
+                    map(below.__getitem__, second[:needed]),
+                )
+            )
+            below.append(0)
+        below_by_stone = {stone: below[ids[stone]] for stone in stones}
+
+        for stone, count in below_by_stone.items():
+            self._store((stone, blinks), count)
+        return sum(
+            freq * below_by_stone[stone] for stone, freq in stones.items()
+        )
+
+    def count(self, stone: int, blinks: int) -> int:
+        """How many stones one stone becomes after blinking."""
+        return self.count_all({stone: 1}, blinks)
+
+
+SparseMatrix = list[dict[int, int]]
+
+
+def sparse_vec_mul(vector: list[int], matrix: SparseMatrix) -> list[int]:
+    """Row vector times a sparse matrix."""
+    result = [0] * len(matrix)
+    for i, value in enumerate(vector):
+        if value:
+            for j, weight in matrix[i].items():
+                result[j] += value * weight
+    return result
+
+
+def sparse_mat_mul(left: SparseMatrix, right: SparseMatrix) -> SparseMatrix:
+    """Multiply two sparse matrices stored as rows of {column: value}."""
+    result: SparseMatrix = []
+    for row in left:
+        product: dict[int, int] = {}
+        for k, value in row.items():
+            for j, weight in right[k].items():
+                product[j] = product.get(j, 0) + value * weight
+        result.append(product)
+    return result
+
+
+@dataclass
+class StoneGraph:
+    """The closed set of stones reachable from a start, each given an id,
+    and the sparse matrix of which stones turn into which after a blink.
+    """
+
+    stones: list[int] = field(default_factory=list)
+    ids: dict[int, int] = field(default_factory=dict)
+    transitions: SparseMatrix = field(default_factory=list)
+
+    @classmethod
+    def from_stones(cls, stones: Iterable[int]) -> "StoneGraph":
+        """Discover every reachable stone and wire up the transitions."""
+        graph = cls(stones=sorted(reachable_stones(stones)))
+        graph.ids = {stone: i for i, stone in enumerate(graph.stones)}
+        for stone in graph.stones:
+            row: dict[int, int] = {}
+            for child in next_stones(stone):
+                child_id = graph.ids[child]
+                row[child_id] = row.get(child_id, 0) + 1
+            graph.transitions.append(row)
+        return graph
+
+    def vector(self, stones: dict) -> list[int]:
+        """Turn a dict of stone -> count into a vector over stone ids."""
+        counts = [0] * len(self.stones)
+        for stone, freq in stones.items():
+            counts[self.ids[stone]] += freq
+        return counts
+
+    def count_after(self, stones: dict, blinks: int) -> int:
+        """Total stones after blinking, one matrix-vector product a blink."""
+        counts = self.vector(stones)
+        for _ in range(blinks):
+            counts = sparse_vec_mul(counts, self.transitions)
+        return sum(counts)
+
+    def count_after_squaring(self, stones: dict, blinks: int) -> int:
+        """Total stones after blinking, by exponentiation by squaring.
+
+        Only log2(blinks) matrix products, but each squaring multiplies a
+        filled in matrix of big ints, so count_after is usually quicker.
+        """
+        counts = self.vector(stones)
+        power = self.transitions
+        while blinks:
+            if blinks & 1:
+                counts = sparse_vec_mul(counts, power)
+            blinks >>= 1
+            if blinks:
+                power = sparse_mat_mul(power, power)
+        return sum(counts)
+
+
+def benchmark(filename: str = "day11input"):
+    """Time the evolver at a few blink counts."""
+    stones = get_input_dict(filename)
+    for blinks in (75, 500, 5000):
+        evolver = StoneEvolver()
+        start = time.perf_counter()
+        total = evolver.count_all(stones, blinks)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{blinks} blinks: {elapsed:.3f}s, {digit_count(total)} digit "
+            f"answer, memo {len(evolver.memo)}/{evolver.maxsize}"
+        )
+        start = time.perf_counter()
+        graph = StoneGraph.from_stones(stones)
+        assert total == graph.count_after(stones, blinks)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{blinks} blinks: {elapsed:.3f}s with the transition graph of "
+            f"{len(graph.stones)} stones"
+        )
+
+
 def debug_and_tests():
     """Test using the sample and examples first."""
     stone_deque = get_input_dict("day11example1")
@@ -82,15 +321,62 @@ def debug_and_tests():
     assert sum(blink(stone_deque, 6).values()) == 22
     assert sum(blink(stone_deque, 25).values()) == 55312
 
+    assert (12, 34) == next_stones(1234)
+    assert (1, 0) == next_stones(10)
+    assert (2024,) == next_stones(1)
+    assert 4 == digit_count(1000)
+    evolver = StoneEvolver()
+    assert 22 == evolver.count_all(stone_deque, 6)
+    assert 55312 == evolver.count_all(stone_deque, 25)
+    assert 7 == evolver.count(125, 6)
+    # 0 -> 1 -> 2024 -> 20 24 -> 2 0 2 4 -> ... closes on itself.
+    assert {0, 1, 2, 4, 20, 24, 2024}.issubset(reachable_stones([0]))
+    assert reachable_stones(reachable_stones([0])) == reachable_stones([0])
+    # The memo never holds more than the bound, even when far fewer than
+    # the reachable stones fit.
+    small = StoneEvolver(maxsize=16)
+    assert len(reachable_stones(stone_deque)) > small.maxsize
+    assert 55312 == small.count_all(stone_deque, 25)
+    assert evolver.count_all(stone_deque, 40) == small.count_all(
+        stone_deque, 40
+    )
+    assert len(small.memo) <= small.maxsize
+    assert 55312 == small.count_all(stone_deque, 25)
+    short = StoneEvolver()
+    assert 7 == short.count(125, 6)
+    assert 7 == short.memo[(125, 6)]
+    rng = random.Random(11)
+    many = {rng.randrange(10**6): 1 for _ in range(2500)}
+    assert sum(blink(many, 3).values()) == (
+        StoneEvolver(maxsize=1000).count_all(many, 3)
+    )
+
+    graph = StoneGraph.from_stones(stone_deque)
+    eleven_graph = StoneGraph.from_stones([11])
+    assert {eleven_graph.ids[1]: 2} == eleven_graph.transitions[
+        eleven_graph.ids[11]
+    ]
+    assert 22 == graph.count_after(stone_deque, 6)
+    assert 55312 == graph.count_after(stone_deque, 25)
+    assert 55312 == graph.count_after_squaring(stone_deque, 25)
+    assert evolver.count_all(stone_deque, 200) == (
+        graph.count_after_squaring(stone_deque, 200)
+    )
+    zero_graph = StoneGraph.from_stones([0])
+    assert zero_graph.count_after({0: 1}, 300) == (
+        zero_graph.count_after_squaring({0: 1}, 300)
+    )
+
 
 def main():
     """Get the answer"""
     stone_dict = get_input_dict("day11input")
-    final_stones = blink(stone_dict, 75)
-    print(sum(final_stones.values()))
+    print(StoneEvolver().count_all(stone_dict, 75))
 
 
 if __name__ == "__main__":
     debug_and_tests()
     print("THE REAL DEAL")
     cProfile.run("main()")
+    # The 5000 blink runs take around 20 seconds.
+    # benchmark()
@@ -1,10 +1,23 @@
 """Code for day 12 part 2"""
 
 from __future__ import annotations
+
+import random
+import time
+import tracemalloc
+from array import array
 from dataclasses import dataclass, field
 from enum import StrEnum, auto
 
 
+# Fence bits for Garden.fences.
+UP_FENCE = 1
+RIGHT_FENCE = 2
+DOWN_FENCE = 4
+LEFT_FENCE = 8
+FENCE_COUNT = [bin(fences).count("1") for fences in range(16)]
+
+
 class Direction(StrEnum):
     """Directions the trail can go."""
 
@@ -14,7 +27,7 @@ class Direction(StrEnum):
     LEFT = auto()
 
 
-@dataclass
+@dataclass(slots=True)
 class Plot:
     """Class representing a single plot.
 
@@ -175,11 +188,14 @@ class Region:
         self.run_calcs()
 
     def _crawl_plots(self, plot):
-        for p in plot.adjacent_matching_plots():
-            if p in self.plots:
-                continue
-            self.plots.add(p)
-            self._crawl_plots(p)
+        # Iterative so big regions don't hit the recursion limit.
+        to_visit = [plot]
+        while to_visit:
+            for p in to_visit.pop().adjacent_matching_plots():
+                if p in self.plots:
+                    continue
+                self.plots.add(p)
+                to_visit.append(p)
 
     def _set_plot_regions(self):
         for plot in self.plots:
@@ -342,6 +358,7 @@ class Grid:
     max_x: int = 0
     max_y: int = 0
     plots: set[Plot] = field(default_factory=set)
+    plot_index: list[Plot | None] = field(default_factory=list)
     regions: list[Region] = field(default_factory=list)
 
     def __post_init__(self):
@@ -364,10 +381,7 @@ class Grid:
             0, self.max_y + 1
         ):
             return None
-        for plot in self.plots:
-            if plot.x == x and plot.y == y:
-                return plot
-        return None
+        return self.plot_index[y * (self.max_x + 1) + x]
 
     def plots_around_plot(self, plot: Plot):
         """Sets Plots from around the given Plot"""
@@ -390,9 +404,13 @@ class Grid:
 
     def _init_plots(self):
         """Initialize the plots for the grid."""
+        width = self.max_x + 1
+        self.plot_index = [None] * (width * (self.max_y + 1))
         for i, y in enumerate(self.initial_map):
             for j, x in enumerate(y):
-                self.plots.add(Plot(x=j, y=i, plant=x))
+                plot = Plot(x=j, y=i, plant=x)
+                self.plot_index[i * width + j] = plot
+                self.plots.add(plot)
         for plot in self.plots:
             self.plots_around_plot(plot)
             plot.set_perimeter()
@@ -441,6 +459,138 @@ class Grid:
         return ret_str
 
 
+@dataclass
+class Garden:
+    """Flat view of the garden with a region label for every cell.
+
+    Regions are found with union-find over a flat parent array, so there's
+    no recursion and no per-plot objects. Each cell only costs a byte for
+    its plant, a byte for its fences and 4 bytes for its label.
+
+    Attributes:
+        initial_map: The garden as read from the input.
+        plants: Plant code of each cell, row-major.
+        fences: Fence bitmask of each cell, using the *_FENCE bits.
+        labels: Region number of each cell, row-major.
+        plant_types: Plant of each region.
+        areas: Area of each region.
+        perimeters: Perimeter of each region.
+        sides: Number of sides of each region.
+    """
+
+    initial_map: list[list[str]] = field(default_factory=list)
+    width: int = 0
+    height: int = 0
+    plants: bytes = b""
+    fences: bytearray = field(default_factory=bytearray)
+    labels: array = field(default_factory=lambda: array("i"))
+    plant_types: list[str] = field(default_factory=list)
+    areas: list[int] = field(default_factory=list)
+    perimeters: list[int] = field(default_factory=list)
+    sides: list[int] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.height = len(self.initial_map)
+        self.width = len(max(self.initial_map, key=len))
+        self.plants = "".join(
+            "".join(row) for row in self.initial_map
+        ).encode()
+        self._label_regions()
+        self._count_sides()
+
+    def _label_regions(self):
+        """Union matching neighbors, then number the regions."""
+        width = self.width
+        plants = self.plants
+        parent = array("i", range(len(plants)))
+
+        def find(i: int) -> int:
+            root = i
+            while parent[root] != root:
+                root = parent[root]
+            # Point everything on the way straight at the root.
+            while parent[i] != root:
+                parent[i], i = root, parent[i]
+            return root
+
+        # Start fenced on all sides and take down fences between matches.
+        fences = self.fences = bytearray(b"\x0f" * len(plants))
+        for i, plant in enumerate(plants):
+            if i % width and plants[i - 1] == plant:
+                parent[find(i)] = find(i - 1)
+                fences[i] &= ~LEFT_FENCE
+                fences[i - 1] &= ~RIGHT_FENCE
+            if i >= width and plants[i - width] == plant:
+                parent[find(i)] = find(i - width)
+                fences[i] &= ~UP_FENCE
+                fences[i - width] &= ~DOWN_FENCE
+
+        region_of_root: dict[int, int] = {}
+        self.labels = array("i", bytes(4 * len(plants)))
+        for i, plant in enumerate(plants):
+            root = find(i)
+            label = region_of_root.get(root)
+            if label is None:
+                label = region_of_root[root] = len(self.areas)
+                self.plant_types.append(chr(plant))
+                self.areas.append(0)
+                self.perimeters.append(0)
+            self.labels[i] = label
+            self.areas[label] += 1
+            self.perimeters[label] += FENCE_COUNT[fences[i]]
+
+    def _count_sides(self):
+        """Count corners, which equal sides, for every region at once.
+
+        Slides a 2x2 window over the labels padded with -1. For a region
+        in the window, 1 or 3 of its cells make one corner, and 2 cells on
+        a diagonal make two.
+        """
+        width = self.width
+        stride = width + 2
+        padded = array("i", [-1]) * (stride * (self.height + 2))
+        for y in range(self.height):
+            start = (y + 1) * stride + 1
+            padded[start : start + width] = self.labels[
+                y * width : (y + 1) * width
+            ]
+        self.sides = [0] * len(self.areas)
+        sides = self.sides
+        for top in range(0, stride * (self.height + 1), stride):
+            for i in range(top, top + width + 1):
+                a, b = padded[i], padded[i + 1]
+                c, d = padded[i + stride], padded[i + stride + 1]
+                if a == b == c == d:
+                    continue
+                for label in {a, b, c, d}:
+                    if label < 0:
+                        continue
+                    matches = (a, b, c, d).count(label)
+                    if matches != 2:
+                        # 1 is an outside corner, 3 an inside one.
+                        sides[label] += matches != 4
+                    elif (a == label) == (d == label):
+                        # Only touching at the diagonal.
+                        sides[label] += 2
+
+    def get_final_cost(self) -> int:
+        """Get the final total cost for the fencing."""
+        final_cost = sum(
+            area * perimeter
+            for area, perimeter in zip(self.areas, self.perimeters)
+        )
+        print(f"FINAL COST = {final_cost}")
+        return final_cost
+
+    def get_final_cost2(self) -> int:
+        """Get the final total cost for the fencing with the discount."""
+        final_cost = sum(
+            area * sides for area, sides in zip(self.areas, self.sides)
+        )
+        print(f"FINAL COST2 = {final_cost}")
+        return final_cost
+
+
 def get_input(filename: str) -> list[list[str]]:
     """Read the file and yield rules."""
     with open(filename, "r", encoding="utf-8") as input_data:
@@ -454,6 +604,54 @@ def get_input(filename: str) -> list[list[str]]:
     return ret_val
 
 
+def random_garden(size: int, plants: str = "ABCDEFGH") -> list[list[str]]:
+    """Make a size x size garden of random plants."""
+    rng = random.Random(size)
+    return [[rng.choice(plants) for _ in range(size)] for _ in range(size)]
+
+
+def benchmark(
+    sizes: tuple[int, ...] = (100, 500, 1000, 2000, 4000),
+    grid_limit: int = 1000,
+):
+    """Time building the grid for a few garden sizes.
+
+    The Plot based Grid takes about 540 bytes a cell, so it's only timed up
+    to grid_limit. The flat Garden is timed at every size.
+    """
+    for size in sizes:
+        garden = random_garden(size)
+        garden_classes = (Grid, Garden) if size <= grid_limit else (Garden,)
+        for garden_class in garden_classes:
+            start = time.perf_counter()
+            built = garden_class(initial_map=garden)
+            elapsed = time.perf_counter() - start
+            if garden_class is Grid:
+                regions = len(built.regions)
+            else:
+                regions = len(built.areas)
+            print(
+                f"{garden_class.__name__} {size}x{size}: {elapsed:.3f}s, "
+                f"{regions} regions"
+            )
+            del built
+
+
+def memory_benchmark(size: int = 300):
+    """Compare bytes per cell of the Plot based Grid and the flat Garden."""
+    garden_map = random_garden(size)
+    for garden_class in (Grid, Garden):
+        tracemalloc.start()
+        built = garden_class(initial_map=garden_map)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            f"{garden_class.__name__}: {current / size**2:.1f} bytes/cell "
+            f"kept, {peak / size**2:.1f} bytes/cell peak"
+        )
+        del built
+
+
 def debug_and_tests():
     """Test using the sample and examples first."""
     # Initial tests of logic
@@ -544,6 +742,41 @@ def debug_and_tests():
             assert 234 == region.cost
     assert 1930 == grid.get_final_cost()
     assert 1206 == grid.get_final_cost2()
+    assert grid.get_plot(4, 2) is grid.plot_index[2 * 10 + 4]
+    assert (4, 2) == (grid.get_plot(4, 2).x, grid.get_plot(4, 2).y)
+    assert grid.get_plot(10, 0) is None
+
+    garden = Garden(initial_map=get_input("day12example1"))
+    assert 5 == len(garden.areas)
+    assert [4, 4, 4, 1, 3] == garden.areas
+    assert [10, 8, 10, 4, 8] == garden.perimeters
+    assert list("ABCDE") == garden.plant_types
+    assert 140 == garden.get_final_cost()
+    assert [4, 4, 8, 4, 4] == garden.sides
+    assert UP_FENCE | DOWN_FENCE | LEFT_FENCE == garden.fences[0]
+    assert UP_FENCE | DOWN_FENCE == garden.fences[1]
+    assert b"AAAABBCDBBCCEEEC" == garden.plants
+    assert 80 == garden.get_final_cost2()
+    garden = Garden(initial_map=get_input("day12example2"))
+    assert 11 == len(garden.areas)
+    assert 1930 == garden.get_final_cost()
+    assert 1206 == garden.get_final_cost2()
+    # The two B regions touch the A region only diagonally.
+    garden = Garden(
+        initial_map=[
+            list("AAAAAA"),
+            list("AAABBA"),
+            list("AAABBA"),
+            list("ABBAAA"),
+            list("ABBAAA"),
+            list("AAAAAA"),
+        ]
+    )
+    assert 368 == garden.get_final_cost2()
+    # One giant region is fine without recursion.
+    garden = Garden(initial_map=[["A"] * 300 for _ in range(300)])
+    assert [300 * 300] == garden.areas
+    assert [4 * 300] == garden.perimeters
 
 
 def main():
@@ -553,9 +786,14 @@ def main():
     print(grid)
     grid.get_final_cost()
     grid.get_final_cost2()
+    garden = Garden(initial_map=input_data)
+    garden.get_final_cost()
+    garden.get_final_cost2()
 
 
 if __name__ == "__main__":
     debug_and_tests()
     print("THE REAL DEAL")
     main()
+    # benchmark()
+    # memory_benchmark()
@@ -1,12 +1,22 @@
 """Code for day 13"""
 
-from dataclasses import dataclass
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
 import re
-from fractions import Fraction
+
+import numpy as np
 
 BUTTON_A_COST = 3
 BUTTON_B_COST = 1
 MAX_BUTTON_PRESS = 100
+PRIZE_OFFSET = 10000000000000
+MACHINE_PATTERN = re.compile(
+    r"Button A: X\+(\d+), Y\+(\d+)\s+"
+    r"Button B: X\+(\d+), Y\+(\d+)\s+"
+    r"Prize: X=(\d+), Y=(\d+)"
+)
+# Keeps digits and turns every other byte into a space.
+DIGITS_ONLY = bytes(c if 48 <= c <= 57 else 32 for c in range(256))
 
 
 class Button:
@@ -27,6 +37,15 @@ class Button:
         self.y = int(m.group("y"))
         self.cost = cost
 
+    @classmethod
+    def from_values(cls, x: int, y: int, cost: int) -> "Button":
+        """Make a button from numbers that were already parsed."""
+        button = cls.__new__(cls)
+        button.x = x
+        button.y = y
+        button.cost = cost
+        return button
+
     def __repr__(self) -> str:
         return f"Button: {self.x=},{self.y=},{self.cost=}"
 
@@ -45,13 +64,135 @@ class Prize:
         if m is None:
             print(f"PROBLEM WITH: {string}")
             raise RuntimeError("Couldn't parse string in prize.")
-        self.x = int(m.group("x")) + 10000000000000
-        self.y = int(m.group("y")) + 10000000000000
+        self.x = int(m.group("x")) + PRIZE_OFFSET
+        self.y = int(m.group("y")) + PRIZE_OFFSET
+
+    @classmethod
+    def from_values(cls, x: int, y: int) -> "Prize":
+        """Make a prize from numbers that were already parsed.
+
+        The offset is added here, same as parsing the string.
+        """
+        prize = cls.__new__(cls)
+        prize.x = x + PRIZE_OFFSET
+        prize.y = y + PRIZE_OFFSET
+        return prize
 
     def __repr__(self) -> str:
         return f"Prize: {self.x=},{self.y=}"
 
 
+def solve_claw(
+    ax: int, ay: int, bx: int, by: int, px: int, py: int
+) -> tuple[int, int] | None:
+    """Solve a machine with integer Cramer's rule.
+
+    Returns:
+        (A presses, B presses) if the prize can be won with whole,
+        non-negative presses, otherwise None.
+    """
+    determinant = ax * by - ay * bx
+    # Parallel buttons.
+    if determinant == 0:
+        return None
+    a_presses, a_remainder = divmod(px * by - py * bx, determinant)
+    if a_remainder:
+        return None
+    b_presses, b_remainder = divmod(ax * py - ay * px, determinant)
+    if b_remainder or a_presses < 0 or b_presses < 0:
+        return None
+    return a_presses, b_presses
+
+
+def batch_cost(
+    machines: Iterable[tuple[int, int, int, int, int, int]],
+) -> int:
+    """Total cost to win over raw (ax, ay, bx, by, px, py) machines.
+
+    Skips building objects so millions of machines can go through.
+    """
+    total = 0
+    for machine in machines:
+        presses = solve_claw(*machine)
+        if presses is not None:
+            total += BUTTON_A_COST * presses[0] + BUTTON_B_COST * presses[1]
+    return total
+
+
+def scan_numbers(text: str | bytes) -> np.ndarray:
+    """Every unsigned integer in the text, in order, as int64s.
+
+    Works on the bytes, blanking out everything that isn't a digit and
+    letting NumPy split what's left, which is a lot quicker than a regex
+    over a big buffer.
+    """
+    if isinstance(text, str):
+        text = text.encode()
+    return np.fromstring(
+        text.translate(DIGITS_ONLY), dtype=np.int64, sep=" "
+    )
+
+
+def _empty_column() -> np.ndarray:
+    """An empty int64 column."""
+    return np.zeros(0, dtype=np.int64)
+
+
+@dataclass
+class MachineColumns:
+    """All machines stored column-wise, one int64 array per value.
+
+    The biggest product in the solve is around 1e15 with the offset, well
+    inside int64.
+
+    Attributes:
+        ax, ay: Button A movement of every machine.
+        bx, by: Button B movement of every machine.
+        px, py: Prize position of every machine.
+    """
+
+    ax: np.ndarray = field(default_factory=_empty_column)
+    ay: np.ndarray = field(default_factory=_empty_column)
+    bx: np.ndarray = field(default_factory=_empty_column)
+    by: np.ndarray = field(default_factory=_empty_column)
+    px: np.ndarray = field(default_factory=_empty_column)
+    py: np.ndarray = field(default_factory=_empty_column)
+
+    @classmethod
+    def from_text(cls, text: str | bytes, offset: int = PRIZE_OFFSET):
+        """Pull every number out of the input, six per machine."""
+        numbers = scan_numbers(text).reshape(-1, 6).T
+        return cls(
+            ax=numbers[0],
+            ay=numbers[1],
+            bx=numbers[2],
+            by=numbers[3],
+            px=numbers[4] + offset,
+            py=numbers[5] + offset,
+        )
+
+    def total_cost(self) -> int:
+        """Solve every machine at once with array arithmetic."""
+        determinant = self.ax * self.by - self.ay * self.bx
+        # Stand in 1 for parallel buttons and mask them out after.
+        divisor = np.where(determinant == 0, 1, determinant)
+        a_presses, a_rem = np.divmod(
+            self.px * self.by - self.py * self.bx, divisor
+        )
+        b_presses, b_rem = np.divmod(
+            self.ax * self.py - self.ay * self.px, divisor
+        )
+        won = (
+            (determinant != 0)
+            & (a_rem == 0)
+            & (b_rem == 0)
+            & (a_presses >= 0)
+            & (b_presses >= 0)
+        )
+        cost = BUTTON_A_COST * a_presses + BUTTON_B_COST * b_presses
+        return int(cost[won].sum())
+
+
 @dataclass
 class Machine:
     """Class representing a single machine
@@ -61,33 +202,39 @@ class Machine:
         button_b: Button B attributes
         prize: Prize attributes
         id_number: Machine ID number
-        solvable: Is the machine solvable/winnable?
-        a_presses: Presses of button A to win.
-        b_presses: Presses of button B to win.
+        presses: (A presses, B presses) to win, None if it can't be won.
     """
 
     button_a: Button
     button_b: Button
     prize: Prize
     id_number: int
+    presses: tuple[int, int] | None = field(init=False)
+
+    def __post_init__(self):
+        # Solve once, everything else reads the result.
+        self.presses = solve_claw(
+            self.button_a.x,
+            self.button_a.y,
+            self.button_b.x,
+            self.button_b.y,
+            self.prize.x,
+            self.prize.y,
+        )
 
     @property
-    def cost_to_win(self) -> Fraction:
+    def cost_to_win(self) -> int:
         """Calculate and return the cost to win with this machine.
 
         Returns:
-            Cost to win as a Fraction/Int.
+            Cost to win, 0 if it can't be won.
         """
+        if self.presses is None:
+            return 0
         return (self.button_a.cost * self.a_presses) + (
             self.button_b.cost * self.b_presses
         )
 
-    # Slope check = -(A/B)==-(D/F)
-    #   -(buttonax/buttonbx)==-(buttonay/buttonby)
-    # Solve for x = (b1c2-b2c1)/(a1b2-a2b1)
-    #   (buttonbx*prizex-buttonby*prizex)/(buttonax*buttonby-buttonay*buttonbx)
-    # Solve for y = (c1a2-c2a1)/(a1b2-a2b1)
-    #   (prizex*buttonay-prizey*buttonax)/(buttonax*buttonby-buttonay*buttonbx)
     @property
     def solvable(self) -> bool:
         """Is this machine solvable/winnable?
@@ -95,48 +242,29 @@ class Machine:
         Returns:
             Boolean of True if solvable/winnable, false if not.
         """
-        # Check slopes for parallel lines.
-        if Fraction(-self.button_a.x, self.button_b.x) == Fraction(
-            -self.button_a.y, self.button_b.y
-        ):
-            return False
-        # Check for non-rational button presses.
-        if not self.a_presses.is_integer() or not self.b_presses.is_integer():
-            return False
-        return True
+        return self.presses is not None
 
     @property
-    def a_presses(self) -> Fraction:
+    def a_presses(self) -> int:
         """Number of presses on button A to win.
 
         Returns:
             Number of button A presses to win.
         """
-        return Fraction(
-            (
-                self.button_b.x * -self.prize.y
-                - self.button_b.y * -self.prize.x
-            ),
-            (
-                self.button_a.x * self.button_b.y
-                - self.button_a.y * self.button_b.x
-            ),
-        )
+        if self.presses is None:
+            raise ValueError(f"Machine {self.id_number} can't be won.")
+        return self.presses[0]
 
     @property
-    def b_presses(self) -> Fraction:
+    def b_presses(self) -> int:
         """Number of presses on button B to win.
 
         Returns:
             Number of button B presses to win.
         """
-        return Fraction(
-            (-self.prize.x * self.button_a.y + self.prize.y * self.button_a.x),
-            (
-                self.button_a.x * self.button_b.y
-                - self.button_a.y * self.button_b.x
-            ),
-        )
+        if self.presses is None:
+            raise ValueError(f"Machine {self.id_number} can't be won.")
+        return self.presses[1]
 
 
 def get_input(filename: str):
@@ -146,6 +274,28 @@ def get_input(filename: str):
     return lines
 
 
+def iter_machines(text: str) -> Iterator[Machine]:
+    """Yield machines straight out of the whole input text.
+
+    One compiled pattern picks up all six numbers of a machine at once, so
+    the last machine doesn't need a blank line after it.
+
+    Args:
+        text: The whole input.
+
+    Yields:
+        Initialized machine objects, in order.
+    """
+    for id_number, match in enumerate(MACHINE_PATTERN.finditer(text)):
+        ax, ay, bx, by, px, py = map(int, match.groups())
+        yield Machine(
+            button_a=Button.from_values(ax, ay, BUTTON_A_COST),
+            button_b=Button.from_values(bx, by, BUTTON_B_COST),
+            prize=Prize.from_values(px, py),
+            id_number=id_number,
+        )
+
+
 def parse_input(input_data: list[str]) -> list[Machine]:
     """Parse the input into objects.
 
@@ -155,32 +305,10 @@ def parse_input(input_data: list[str]) -> list[Machine]:
     Returns:
         List of initialized machine objects.
     """
-    id_number = 0
-    machines: list[Machine] = []
-    button_a = None
-    button_b = None
-    prize = None
-    for string in input_data:
-        if "Button A" in string:
-            button_a = Button(string=string, cost=BUTTON_A_COST)
-        if "Button B" in string:
-            button_b = Button(string=string, cost=BUTTON_B_COST)
-        if "Prize" in string:
-            prize = Prize(string=string)
-        if string == "" and button_a and button_b and prize:
-            machines.append(
-                Machine(
-                    button_a=button_a,
-                    button_b=button_b,
-                    prize=prize,
-                    id_number=id_number,
-                )
-            )
-            id_number += 1
-    return machines
-
-
-def get_total_cost(machines: list[Machine]) -> int | Fraction:
+    return list(iter_machines("\n".join(input_data)))
+
+
+def get_total_cost(machines: list[Machine]) -> int:
     """Calculate the final answer
 
     Args:
@@ -216,14 +344,45 @@ def debug_and_tests():
     assert machines[1].solvable is True
     assert machines[2].solvable is False
     assert machines[3].solvable is True
-    get_total_cost(machines=machines)
+    assert (118679050709, 103199174542) == machines[1].presses
+    total = get_total_cost(machines=machines)
+    assert total == batch_cost(
+        (
+            m.button_a.x,
+            m.button_a.y,
+            m.button_b.x,
+            m.button_b.y,
+            m.prize.x,
+            m.prize.y,
+        )
+        for m in machines
+    )
+    with open("day13example", "r", encoding="utf-8") as example:
+        columns = MachineColumns.from_text(example.read())
+    assert 4 == len(columns.ax)
+    assert total == columns.total_cost()
+    assert [94, 34, 22, 67] == scan_numbers(
+        "Button A: X+94, Y+34\nButton B: X+22, Y+67"
+    ).tolist()
+    # No blank line needed after the last machine.
+    example_text = "\n".join(input_data).strip()
+    assert 4 == len(list(iter_machines(example_text)))
+    assert 8400 + PRIZE_OFFSET == next(iter_machines(example_text)).prize.x
+    # Part 1 numbers from the example.
+    assert (80, 40) == solve_claw(94, 34, 22, 67, 8400, 5400)
+    assert solve_claw(26, 66, 67, 21, 12748, 12176) is None
+    assert solve_claw(1, 1, 2, 2, 3, 3) is None
+    # Negative presses can't win.
+    assert solve_claw(1, 0, 0, 1, -1, 1) is None
 
 
 def main():
     """Get the answer"""
     input_data = get_input("day13input")
     machines = parse_input(input_data)
-    get_total_cost(machines=machines)
+    total = get_total_cost(machines=machines)
+    columns = MachineColumns.from_text("\n".join(input_data))
+    assert total == columns.total_cost()
 
 
 if __name__ == "__main__":
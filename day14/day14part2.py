@@ -2,7 +2,12 @@
 
 from __future__ import annotations
 from dataclasses import dataclass, field
+from math import gcd, lcm
 import re
+import struct
+import zlib
+
+import numpy as np
 import time
 import os
 
@@ -50,6 +55,13 @@ class Robot:
         if self.current_y < 0:
             self.current_y = self.current_y + grid.max_y
 
+    def position_at(self, seconds: int, grid: Grid) -> tuple[int, int]:
+        """Where the robot is after seconds from its initial position."""
+        return (
+            (self.init_x + self.x_velocity * seconds) % grid.max_x,
+            (self.init_y + self.y_velocity * seconds) % grid.max_y,
+        )
+
     def __repr__(self) -> str:
         return (
             f"Robot: {self.current_x=},{self.current_y=}\n"
@@ -57,6 +69,85 @@ class Robot:
         )
 
 
+ROBOT_PIXEL = 255
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Turns a rendered frame straight into the text map.
+TEXT_PIXELS = bytes.maketrans(bytes([0, ROBOT_PIXEL]), b".#")
+
+
+class FrameRenderer:
+    """Draws robot positions into one reusable 8-bit grayscale buffer.
+
+    Attributes:
+        width: Frame width in pixels
+        height: Frame height in pixels
+        pixels: (height, width) uint8 array, ROBOT_PIXEL where robots are
+    """
+
+    def __init__(self, width: int, height: int) -> None:
+        """Set up the buffer once, every frame reuses it."""
+        self.width = width
+        self.height = height
+        self.pixels = np.zeros((height, width), dtype=np.uint8)
+        # Each PNG row starts with filter type 0 (none).
+        self._png_rows = np.zeros((height, width + 1), dtype=np.uint8)
+
+    def render(self, positions: np.ndarray) -> np.ndarray:
+        """Clear the buffer and mark the (robots, 2) x, y positions."""
+        self.pixels.fill(0)
+        self.pixels[positions[:, 1], positions[:, 0]] = ROBOT_PIXEL
+        return self.pixels
+
+    def to_text(self) -> str:
+        """The current frame as rows of "." and "#"."""
+        text = self.pixels.tobytes().translate(TEXT_PIXELS).decode("ascii")
+        return "".join(
+            text[start : start + self.width] + "\n"
+            for start in range(0, len(text), self.width)
+        )
+
+    def to_pgm(self) -> bytes:
+        """The current frame as a binary (P5) PGM image."""
+        header = f"P5\n{self.width} {self.height}\n255\n".encode("ascii")
+        return header + self.pixels.tobytes()
+
+    def to_png(self) -> bytes:
+        """The current frame as a grayscale PNG image."""
+        self._png_rows[:, 1:] = self.pixels
+        # 8 bit grayscale, default compression, filtering and no interlace.
+        header = struct.pack(
+            ">IIBBBBB", self.width, self.height, 8, 0, 0, 0, 0
+        )
+        return (
+            PNG_SIGNATURE
+            + _png_chunk(b"IHDR", header)
+            + _png_chunk(b"IDAT", zlib.compress(self._png_rows))
+            + _png_chunk(b"IEND", b"")
+        )
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    """Length, type, data and CRC of one PNG chunk."""
+    return (
+        struct.pack(">I", len(data))
+        + kind
+        + data
+        + struct.pack(">I", zlib.crc32(kind + data))
+    )
+
+
+def unpack_frame_stack(stack: bytes) -> list[bytes]:
+    """Split a stack from Grid.frame_stack back into raw frames."""
+    data = zlib.decompress(stack)
+    header_end = data.index(b"\n") + 1
+    width, height, count = map(int, data[:header_end].split())
+    size = width * height
+    return [
+        data[header_end + i * size : header_end + (i + 1) * size]
+        for i in range(count)
+    ]
+
+
 @dataclass
 class Grid:
     """Class representing the grid of the room"""
@@ -67,10 +158,27 @@ class Grid:
     robots: list[Robot] = field(default_factory=list)
     x_middle: int = -1
     y_middle: int = -1
+    _renderer: FrameRenderer | None = field(default=None, repr=False)
+    sizes: np.ndarray = field(init=False, repr=False)
+    starts: np.ndarray = field(init=False, repr=False)
+    velocities: np.ndarray = field(init=False, repr=False)
 
     def __post_init__(self):
         self._make_or_clear_map()
         self._calc_middles()
+        self._robot_arrays()
+
+    def _robot_arrays(self) -> None:
+        """Keep every robot's start and velocity as (robots, 2) arrays."""
+        self.sizes = np.array([self.max_x, self.max_y], dtype=np.int64)
+        self.starts = np.array(
+            [(robot.init_x, robot.init_y) for robot in self.robots],
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        self.velocities = np.array(
+            [(robot.x_velocity, robot.y_velocity) for robot in self.robots],
+            dtype=np.int64,
+        ).reshape(-1, 2)
 
     def _make_or_clear_map(self) -> None:
         """Reset the map grid back to dots."""
@@ -119,28 +227,155 @@ class Grid:
 
     def move_robots(self, seconds: int = 1) -> None:
         """Move all robots"""
-        for robot in self.robots:
-            for _ in range(seconds):
-                robot.move(grid=self)
+        current = np.array(
+            [(robot.current_x, robot.current_y) for robot in self.robots],
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        # Jump straight there instead of moving a second at a time.
+        step = self.velocities * (seconds % self.period)
+        moved = (current + step) % self.sizes
+        for robot, (x, y) in zip(self.robots, moved.tolist()):
+            robot.current_x = x
+            robot.current_y = y
+
+    def positions_at(self, seconds: int) -> np.ndarray:
+        """(x, y) of every robot at a time, without moving them.
+
+        Everything repeats every period, so any time stays inside int64.
+        """
+        step = self.velocities * (seconds % self.period)
+        return (self.starts + step) % self.sizes
+
+    @property
+    def period(self) -> int:
+        """Seconds until every robot is back where it started."""
+        return lcm(self.max_x, self.max_y)
+
+    def _side_masks(
+        self, size: int, middle: int, axis: str
+    ) -> list[tuple[int, int]]:
+        """Bitmasks of robots below and above the middle for each second.
+
+        One axis repeats every size seconds. Bit i is robot i.
+        """
+        masks = []
+        for seconds in range(size):
+            low = high = 0
+            for i, robot in enumerate(self.robots):
+                if axis == "x":
+                    where = (robot.init_x + robot.x_velocity * seconds) % size
+                else:
+                    where = (robot.init_y + robot.y_velocity * seconds) % size
+                if where < middle:
+                    low |= 1 << i
+                elif where > middle:
+                    high |= 1 << i
+            masks.append((low, high))
+        return masks
+
+    def _axis_spreads(self, size: int, axis: str) -> list[int]:
+        """How spread out the robots are on one axis at each second.
+
+        That axis repeats every size seconds. Uses the variance of the
+        robots' coordinates, times the robot count squared to stay in ints.
+        """
+        spreads = []
+        count = len(self.robots)
+        for seconds in range(size):
+            if axis == "x":
+                where = [
+                    (robot.init_x + robot.x_velocity * seconds) % size
+                    for robot in self.robots
+                ]
+            else:
+                where = [
+                    (robot.init_y + robot.y_velocity * seconds) % size
+                    for robot in self.robots
+                ]
+            total = sum(where)
+            spreads.append(count * sum(w * w for w in where) - total * total)
+        return spreads
+
+    def find_easter_egg(self) -> int:
+        """Find the second the robots draw the tree, without rendering.
+
+        x repeats every width seconds and y every height seconds, so find
+        the tightest time for each axis on its own. When width and height
+        are coprime those join with the Chinese remainder theorem, otherwise
+        the tightest second of the whole period is searched for.
+        """
+        x_spreads = self._axis_spreads(self.max_x, "x")
+        y_spreads = self._axis_spreads(self.max_y, "y")
+        if gcd(self.max_x, self.max_y) != 1:
+            return min(
+                range(self.period),
+                key=lambda seconds: x_spreads[seconds % self.max_x]
+                + y_spreads[seconds % self.max_y],
+            )
+        x_time = x_spreads.index(min(x_spreads))
+        y_time = y_spreads.index(min(y_spreads))
+        # t = x_time + max_x * k, and t = y_time (mod max_y).
+        k = (y_time - x_time) * pow(self.max_x, -1, self.max_y) % self.max_y
+        return x_time + self.max_x * k
+
+    def safety_factors(self) -> list[int]:
+        """Safety factor at every second of the period.
+
+        The x and y sides only depend on the time mod the width and height,
+        so those get worked out once per axis as robot bitmasks and each
+        second just ANDs and counts them.
+        """
+        x_masks = self._side_masks(self.max_x, self.x_middle, "x")
+        y_masks = self._side_masks(self.max_y, self.y_middle, "y")
+        factors = []
+        for seconds in range(self.period):
+            left, right = x_masks[seconds % self.max_x]
+            top, bottom = y_masks[seconds % self.max_y]
+            factors.append(
+                (left & top).bit_count()
+                * (right & top).bit_count()
+                * (left & bottom).bit_count()
+                * (right & bottom).bit_count()
+            )
+        return factors
+
+    @property
+    def renderer(self) -> FrameRenderer:
+        """The frame renderer for this grid, made on first use."""
+        if self._renderer is None:
+            self._renderer = FrameRenderer(self.max_x, self.max_y)
+        return self._renderer
+
+    def render(self, seconds: int | None = None) -> np.ndarray:
+        """Render the robots now, or at a time without moving them."""
+        if seconds is None:
+            positions = np.array(
+                [(robot.current_x, robot.current_y) for robot in self.robots],
+                dtype=np.int64,
+            ).reshape(-1, 2)
+        else:
+            positions = self.positions_at(seconds)
+        return self.renderer.render(positions)
+
+    def frame_stack(self, times, level: int = 6) -> bytes:
+        """Render a run of times into one zlib compressed stack of frames.
+
+        The stack starts with a "width height count" line and then has the
+        raw frames back to back, see unpack_frame_stack.
+        """
+        times = list(times)
+        compressor = zlib.compressobj(level)
+        header = f"{self.max_x} {self.max_y} {len(times)}\n"
+        chunks = [compressor.compress(header.encode("ascii"))]
+        for seconds in times:
+            chunks.append(compressor.compress(self.render(seconds)))
+        chunks.append(compressor.flush())
+        return b"".join(chunks)
 
     def __repr__(self) -> str:
-        """Prints the grid in a grid format with axis legends"""
-        self.update_map()
-        justification = 1
-        # head_foot: str = "".join([" " for _ in range(justification)]) + (
-        #     "".join([str(i).center(3) for i in range(self.max_x)])
-        # )
-        ret_str: str = ""
-
-        for i, y in enumerate(self.map_positions):
-            # Add the header and footer numbers.
-            # if i == 0:
-            #     ret_str += head_foot + "\n"
-            # line_start = f"{i}".rjust(justification) + " "
-            line_end = "\n"
-            line = "".join(y)
-            ret_str += line + line_end
-        return ret_str
+        """Prints the grid in a grid format"""
+        self.render()
+        return self.renderer.to_text()
 
 
 def get_input(filename: str):
@@ -205,28 +440,71 @@ def debug_and_tests():
     print("After 100s")
     print(room_map)
     assert room_map.calc_safety_factor() == 12
+    assert room_map.positions_at(100).tolist() == [
+        [robot.current_x, robot.current_y] for robot in room_map.robots
+    ]
+    assert room_map.positions_at(10**12).tolist() == [
+        list(robot.position_at(10**12, room_map)) for robot in room_map.robots
+    ]
+    assert 12 == room_map.safety_factors()[100 % room_map.period]
+    assert 77 == room_map.period
+    # Any time at all is just one multiply and mod per robot.
+    robot = parse_input(["p=2,4 v=2,-3"])[0]
+    assert (1, 3) == robot.position_at(5, room_map)
+    assert robot.position_at(10**12 % 77, room_map) == robot.position_at(
+        10**12, room_map
+    )
+
+    # Robots that all meet at one cell at second 40.
+    robots = parse_input(
+        [
+            f"p={(5 - 40 * vx) % 11},{(3 - 40 * vy) % 7} v={vx},{vy}"
+            for vx, vy in [(1, 2), (-3, 1), (4, -2), (2, 5), (-1, -1)]
+        ]
+    )
+    room_map = Grid(max_x=11, max_y=7, robots=robots)
+    assert 40 == room_map.find_easter_egg()
+    # Sizes sharing a factor can't use the CRT, so search the period.
+    robots = parse_input(
+        [
+            f"p={(5 - 40 * vx) % 12},{(3 - 40 * vy) % 8} v={vx},{vy}"
+            for vx, vy in [(1, 2), (-3, 1), (4, -2), (2, 5), (-1, -1)]
+        ]
+    )
+    room_map = Grid(max_x=12, max_y=8, robots=robots)
+    assert 40 % room_map.period == room_map.find_easter_egg()
+
+    # Frames come out of one reused buffer.
+    room_map = Grid(max_x=11, max_y=7, robots=parse_input(input_data))
+    room_map.update_map()
+    assert repr(room_map) == "".join(
+        "".join(row) + "\n" for row in room_map.map_positions
+    )
+    frame = room_map.render(100)
+    assert frame is room_map.render(0)
+    x, y = room_map.positions_at(3)[0]
+    assert ROBOT_PIXEL == room_map.render(3)[y, x]
+    pgm = room_map.renderer.to_pgm()
+    assert pgm.startswith(b"P5\n11 7\n255\n") and len(pgm) == 12 + 77
+    png = room_map.renderer.to_png()
+    assert png.startswith(PNG_SIGNATURE) and png.endswith(
+        _png_chunk(b"IEND", b"")
+    )
+    frames = unpack_frame_stack(room_map.frame_stack(range(10)))
+    assert 10 == len(frames)
+    assert frames[3] == room_map.render(3).tobytes()
 
 
 def main():
     """Get the answer"""
-    # Higher than 1804
-    # Lower than 8000
-    # 7758 is too low, but shows the tree...
     input_data = get_input("day14input")
     robots = parse_input(input_data)
     room_map = Grid(max_x=101, max_y=103, robots=robots)
-    cur_time = 7861
-    # jump_time = 103
-    room_map.move_robots(cur_time)
-    print(f"CURRENT TIME: {cur_time}")
-    print(room_map)
-    # while cur_time < 8001:
-    #     input()
-    #     room_map.move_robots()
-    #     print(f"CURRENT TIME: {cur_time}")
-    #     print(room_map)
-    #     # time.sleep(0.2)
-    #     cur_time += 1
+    cur_time = room_map.find_easter_egg()
+    print(f"EASTER EGG TIME: {cur_time}")
+    # room_map.render(cur_time)
+    # with open(f"day14_{cur_time}.png", "wb") as image:
+    #     image.write(room_map.renderer.to_png())
 
 
 if __name__ == "__main__":